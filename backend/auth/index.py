@@ -6,15 +6,92 @@ Returns: HTTP response with auth tokens and user data
 
 import json
 import os
+import re
+import time
+import random
 import hashlib
 import psycopg2
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 
+REPLICA_WAIT_SECONDS = float(os.environ.get('REPLICA_WAIT_SECONDS', '0.5'))
+REPLICA_POLL_SECONDS = 0.05
+REPLICA_CONNECT_TIMEOUT = 2
+REPLICA_COOLDOWN_SECONDS = 30
+LSN_PATTERN = re.compile(r'^[0-9A-Fa-f]{1,8}/[0-9A-Fa-f]{1,8}$')
+
+# Replicas that failed to connect are skipped until this time, kept across warm invocations
+replica_down_until: Dict[str, float] = {}
+
 def get_db_connection():
     dsn = os.environ.get('DATABASE_URL')
     return psycopg2.connect(dsn)
 
+def get_replica_dsns() -> List[str]:
+    raw = os.environ.get('DATABASE_REPLICA_URLS', '')
+    return [dsn.strip() for dsn in raw.split(',') if dsn.strip()]
+
+def replica_caught_up(conn, min_lsn: str, deadline: float) -> bool:
+    cur = conn.cursor()
+    while True:
+        cur.execute('SELECT COALESCE(pg_last_wal_replay_lsn() >= %s::pg_lsn, TRUE)', (min_lsn,))
+        caught_up = cur.fetchone()[0]
+        if caught_up or time.monotonic() >= deadline:
+            break
+        time.sleep(REPLICA_POLL_SECONDS)
+    cur.close()
+    conn.rollback()
+    return caught_up
+
+def get_read_connection(min_lsn: Optional[str] = None):
+    '''
+    Read-only actions go to a random replica from DATABASE_REPLICA_URLS.
+    If the client sent the LSN of its last write, the replica must have replayed it
+    within REPLICA_WAIT_SECONDS, otherwise the read falls back to the primary.
+    '''
+    if min_lsn and not LSN_PATTERN.match(min_lsn):
+        min_lsn = None
+    
+    replica_dsns = get_replica_dsns()
+    random.shuffle(replica_dsns)
+    deadline = time.monotonic() + REPLICA_WAIT_SECONDS
+    
+    for dsn in replica_dsns:
+        if replica_down_until.get(dsn, 0) > time.monotonic():
+            continue
+        try:
+            conn = psycopg2.connect(dsn, connect_timeout=REPLICA_CONNECT_TIMEOUT)
+        except psycopg2.Error:
+            replica_down_until[dsn] = time.monotonic() + REPLICA_COOLDOWN_SECONDS
+            continue
+        if not min_lsn or replica_caught_up(conn, min_lsn, deadline):
+            return conn
+        conn.close()
+    
+    return get_db_connection()
+
+def get_current_lsn(cur) -> str:
+    cur.execute('SELECT pg_current_wal_lsn()::text')
+    return cur.fetchone()[0]
+
+def invalidate_contact_snapshots_including(cur, user_id: int) -> None:
+    '''
+    Only snapshots that already exist are touched, locked in user_id order
+    so concurrent profile updates with overlapping followers cannot deadlock.
+    '''
+    cur.execute('''
+        UPDATE contact_snapshots s
+        SET version = s.version + 1, pages = NULL, built_at = NULL
+        FROM (
+            SELECT cs.user_id FROM contact_snapshots cs
+            JOIN contacts c ON c.user_id = cs.user_id
+            WHERE c.contact_user_id = %s
+            ORDER BY cs.user_id
+            FOR UPDATE OF cs
+        ) followers
+        WHERE s.user_id = followers.user_id
+    ''', (user_id,))
+
 def hash_password(password: str) -> str:
     return hashlib.sha256(password.encode()).hexdigest()
 
@@ -40,7 +117,11 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     }
     
     try:
-        conn = get_db_connection()
+        if method == 'GET':
+            min_lsn = (event.get('queryStringParameters') or {}).get('min_lsn')
+            conn = get_read_connection(min_lsn)
+        else:
+            conn = get_db_connection()
         cur = conn.cursor()
         
         if method == 'POST':
@@ -80,6 +161,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                         WHERE id = %s
                     ''', (user[0],))
                     conn.commit()
+                    lsn = get_current_lsn(cur)
                     
                     return {
                         'statusCode': 200,
@@ -96,7 +178,8 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                                 'is_admin': user[6],
                                 'is_verified': user[7],
                                 'is_friend_of_admin': user[8]
-                            }
+                            },
+                            'lsn': lsn
                         }),
                         'isBase64Encoded': False
                     }
@@ -136,6 +219,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 
                 new_user = cur.fetchone()
                 conn.commit()
+                lsn = get_current_lsn(cur)
                 
                 return {
                     'statusCode': 201,
@@ -145,7 +229,8 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                         'user': {
                             'id': new_user[0],
                             'username': new_user[1]
-                        }
+                        },
+                        'lsn': lsn
                     }),
                     'isBase64Encoded': False
                 }
@@ -165,7 +250,9 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 ''', (first_name, last_name, display_name, avatar_url, user_id))
                 
                 updated_user = cur.fetchone()
+                invalidate_contact_snapshots_including(cur, user_id)
                 conn.commit()
+                lsn = get_current_lsn(cur)
                 
                 return {
                     'statusCode': 200,
@@ -179,7 +266,8 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                             'first_name': updated_user[3],
                             'last_name': updated_user[4],
                             'avatar_url': updated_user[5]
-                        }
+                        },
+                        'lsn': lsn
                     }),
                     'isBase64Encoded': False
                 }
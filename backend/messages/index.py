@@ -6,14 +6,219 @@ Returns: HTTP response with messages, contacts, and chat data
 
 import json
 import os
+import base64
+import re
+import time
+import random
 import psycopg2
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 
+REPLICA_WAIT_SECONDS = float(os.environ.get('REPLICA_WAIT_SECONDS', '0.5'))
+REPLICA_POLL_SECONDS = 0.05
+REPLICA_CONNECT_TIMEOUT = 2
+REPLICA_COOLDOWN_SECONDS = 30
+LSN_PATTERN = re.compile(r'^[0-9A-Fa-f]{1,8}/[0-9A-Fa-f]{1,8}$')
+CONTACTS_PAGE_SIZE = 50
+CONTACTS_MAX_PAGE_SIZE = 200
+ONLINE_WINDOW = timedelta(minutes=1)
+
+# Replicas that failed to connect are skipped until this time, kept across warm invocations
+replica_down_until: Dict[str, float] = {}
+
 def get_db_connection():
     dsn = os.environ.get('DATABASE_URL')
     return psycopg2.connect(dsn)
 
+def get_replica_dsns() -> List[str]:
+    raw = os.environ.get('DATABASE_REPLICA_URLS', '')
+    return [dsn.strip() for dsn in raw.split(',') if dsn.strip()]
+
+def replica_caught_up(conn, min_lsn: str, deadline: float) -> bool:
+    cur = conn.cursor()
+    while True:
+        cur.execute('SELECT COALESCE(pg_last_wal_replay_lsn() >= %s::pg_lsn, TRUE)', (min_lsn,))
+        caught_up = cur.fetchone()[0]
+        if caught_up or time.monotonic() >= deadline:
+            break
+        time.sleep(REPLICA_POLL_SECONDS)
+    cur.close()
+    conn.rollback()
+    return caught_up
+
+def get_read_connection(min_lsn: Optional[str] = None):
+    '''
+    Read-only actions go to a random replica from DATABASE_REPLICA_URLS.
+    If the client sent the LSN of its last write, the replica must have replayed it
+    within REPLICA_WAIT_SECONDS, otherwise the read falls back to the primary.
+    '''
+    if min_lsn and not LSN_PATTERN.match(min_lsn):
+        min_lsn = None
+    
+    replica_dsns = get_replica_dsns()
+    random.shuffle(replica_dsns)
+    deadline = time.monotonic() + REPLICA_WAIT_SECONDS
+    
+    for dsn in replica_dsns:
+        if replica_down_until.get(dsn, 0) > time.monotonic():
+            continue
+        try:
+            conn = psycopg2.connect(dsn, connect_timeout=REPLICA_CONNECT_TIMEOUT)
+        except psycopg2.Error:
+            replica_down_until[dsn] = time.monotonic() + REPLICA_COOLDOWN_SECONDS
+            continue
+        if not min_lsn or replica_caught_up(conn, min_lsn, deadline):
+            return conn
+        conn.close()
+    
+    return get_db_connection()
+
+def get_current_lsn(cur) -> str:
+    cur.execute('SELECT pg_current_wal_lsn()::text')
+    return cur.fetchone()[0]
+
+def next_message_version(cur, chat_id: int) -> Optional[int]:
+    '''
+    Bumps the chat's version counter. The chat row stays locked until commit,
+    so versions within a chat become visible to readers in increasing order.
+    '''
+    cur.execute('UPDATE chats SET msg_version = msg_version + 1 WHERE id = %s RETURNING msg_version', (chat_id,))
+    chat = cur.fetchone()
+    return chat[0] if chat else None
+
+def invalidate_contacts_snapshot(cur, user_id: int) -> None:
+    cur.execute('''
+        INSERT INTO contact_snapshots (user_id, version, pages)
+        VALUES (%s, 1, NULL)
+        ON CONFLICT (user_id) DO UPDATE
+        SET version = contact_snapshots.version + 1, pages = NULL, built_at = NULL
+    ''', (user_id,))
+
+def store_contacts_page(user_id: int, version: int, sort: str, page: Dict[str, Any]) -> None:
+    '''
+    Reads may be served by a replica, so the page is written through the primary.
+    It is dropped if the list was invalidated while it was being built.
+    '''
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute('''
+            INSERT INTO contact_snapshots (user_id, version, pages, built_at)
+            VALUES (%s, %s, jsonb_build_object(%s::text, %s::jsonb), CURRENT_TIMESTAMP)
+            ON CONFLICT (user_id) DO UPDATE
+            SET pages = COALESCE(contact_snapshots.pages, '{}'::jsonb) || EXCLUDED.pages,
+                built_at = EXCLUDED.built_at
+            WHERE contact_snapshots.version = EXCLUDED.version
+        ''', (user_id, version, sort, json.dumps(page)))
+        conn.commit()
+    finally:
+        conn.close()
+
+CONTACT_PRESENCE_FIELDS = ('last_seen', 'status_visibility')
+
+def with_live_presence(cur, contacts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    '''
+    last_seen changes on every login, so cached pages hold profile fields only
+    and presence is read for the ids on the page.
+    '''
+    if not contacts:
+        return contacts
+    
+    cur.execute('SELECT id, last_seen, status_visibility FROM users WHERE id = ANY(%s)',
+                ([cont['user_id'] for cont in contacts],))
+    presence = {row[0]: (row[1], row[2]) for row in cur.fetchall()}
+    
+    contacts_with_presence = []
+    for cont in contacts:
+        last_seen, status_visibility = presence.get(cont['user_id'], (None, None))
+        contacts_with_presence.append({
+            **cont,
+            'last_seen': last_seen.isoformat() if last_seen else None,
+            'status_visibility': status_visibility
+        })
+    return contacts_with_presence
+
+CONTACT_SORT_NAME = 'lower(COALESCE(c.custom_name, u.display_name, u.username))'
+
+# sort -> (ORDER BY, condition for rows after the cursor)
+CONTACT_SORTS = {
+    'recent': ('c.added_at DESC, c.id DESC', '(c.added_at, c.id) < (%s::timestamp, %s)'),
+    'name': (f'{CONTACT_SORT_NAME}, c.id', f'({CONTACT_SORT_NAME}, c.id) > (%s, %s)')
+}
+
+def query_contacts_page(cur, user_id: int, sort: str, cursor: Optional[tuple], limit: int,
+                        verified: bool, online: bool, prefix: str) -> Dict[str, Any]:
+    conditions = ['c.user_id = %s']
+    params: List[Any] = [user_id]
+    
+    if verified:
+        conditions.append('u.is_verified')
+    
+    if online:
+        conditions.append("u.status_visibility != 'hidden' AND u.last_seen > LOCALTIMESTAMP - %s")
+        params.append(ONLINE_WINDOW)
+    
+    if prefix:
+        pattern = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        conditions.append('(lower(u.username) LIKE %s OR lower(u.display_name) LIKE %s OR lower(c.custom_name) LIKE %s)')
+        params.extend([pattern, pattern, pattern])
+    
+    order_by, after_cursor = CONTACT_SORTS[sort]
+    
+    if cursor:
+        conditions.append(after_cursor)
+        params.extend(cursor)
+    
+    cur.execute(f'''
+        SELECT c.id, c.contact_user_id, c.custom_name, 
+               u.username, u.display_name, u.avatar_url, 
+               u.is_verified, u.is_friend_of_admin, u.last_seen, u.status_visibility,
+               c.added_at, {CONTACT_SORT_NAME}
+        FROM contacts c
+        JOIN users u ON c.contact_user_id = u.id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY {order_by}
+        LIMIT %s
+    ''', params + [limit + 1])
+    
+    contacts = cur.fetchall()
+    page = contacts[:limit]
+    
+    next_cursor = None
+    if len(contacts) > limit:
+        last = page[-1]
+        key = last[10].isoformat(timespec='microseconds') if sort == 'recent' else last[11]
+        next_cursor = encode_cursor((key, last[0]))
+    
+    return {
+        'contacts': [{
+            'id': cont[0],
+            'user_id': cont[1],
+            'custom_name': cont[2],
+            'username': cont[3],
+            'display_name': cont[4],
+            'avatar_url': cont[5],
+            'is_verified': cont[6],
+            'is_friend_of_admin': cont[7],
+            'last_seen': cont[8].isoformat() if cont[8] else None,
+            'status_visibility': cont[9],
+            'added_at': cont[10].isoformat()
+        } for cont in page],
+        'next_cursor': next_cursor
+    }
+
+def encode_cursor(key: tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode()
+
+def decode_cursor(cursor: str, sort: str) -> tuple:
+    key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    if (not isinstance(key, list) or len(key) != 2 or not isinstance(key[0], str)
+            or not isinstance(key[1], int) or isinstance(key[1], bool)):
+        raise ValueError('Invalid cursor')
+    if sort == 'recent':
+        datetime.fromisoformat(key[0])
+    return tuple(key)
+
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     method: str = event.get('httpMethod', 'GET')
     
@@ -36,7 +241,11 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     }
     
     try:
-        conn = get_db_connection()
+        if method == 'GET':
+            min_lsn = (event.get('queryStringParameters') or {}).get('min_lsn')
+            conn = get_read_connection(min_lsn)
+        else:
+            conn = get_db_connection()
         cur = conn.cursor()
         
         if method == 'POST':
@@ -51,14 +260,25 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 file_url = body_data.get('file_url')
                 file_name = body_data.get('file_name')
                 
+                version = next_message_version(cur, chat_id)
+                
+                if version is None:
+                    return {
+                        'statusCode': 404,
+                        'headers': headers,
+                        'body': json.dumps({'success': False, 'error': 'Чат не найден'}),
+                        'isBase64Encoded': False
+                    }
+                
                 cur.execute('''
-                    INSERT INTO messages (chat_id, sender_id, content, message_type, file_url, file_name)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    RETURNING id, chat_id, sender_id, content, message_type, file_url, file_name, created_at
-                ''', (chat_id, sender_id, content, message_type, file_url, file_name))
+                    INSERT INTO messages (chat_id, sender_id, content, message_type, file_url, file_name, version)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                    RETURNING id, chat_id, sender_id, content, message_type, file_url, file_name, created_at, version
+                ''', (chat_id, sender_id, content, message_type, file_url, file_name, version))
                 
                 message = cur.fetchone()
                 conn.commit()
+                lsn = get_current_lsn(cur)
                 
                 return {
                     'statusCode': 201,
@@ -73,8 +293,10 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                             'message_type': message[4],
                             'file_url': message[5],
                             'file_name': message[6],
-                            'created_at': message[7].isoformat()
-                        }
+                            'created_at': message[7].isoformat(),
+                            'version': message[8]
+                        },
+                        'lsn': lsn
                     }),
                     'isBase64Encoded': False
                 }
@@ -104,12 +326,15 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     RETURNING id
                 ''', (user_id, contact_user_id, custom_name))
                 
+                if cur.fetchone():
+                    invalidate_contacts_snapshot(cur, user_id)
                 conn.commit()
+                lsn = get_current_lsn(cur)
                 
                 return {
                     'statusCode': 201,
                     'headers': headers,
-                    'body': json.dumps({'success': True, 'contact_user_id': contact_user_id}),
+                    'body': json.dumps({'success': True, 'contact_user_id': contact_user_id, 'lsn': lsn}),
                     'isBase64Encoded': False
                 }
             
@@ -141,11 +366,12 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 
                 chat_id = cur.fetchone()[0]
                 conn.commit()
+                lsn = get_current_lsn(cur)
                 
                 return {
                     'statusCode': 201,
                     'headers': headers,
-                    'body': json.dumps({'success': True, 'chat_id': chat_id}),
+                    'body': json.dumps({'success': True, 'chat_id': chat_id, 'lsn': lsn}),
                     'isBase64Encoded': False
                 }
             
@@ -168,6 +394,158 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'body': json.dumps({'success': True}),
                     'isBase64Encoded': False
                 }
+            
+            elif action == 'edit_message':
+                message_id = body_data.get('message_id')
+                sender_id = body_data.get('sender_id')
+                content = body_data.get('content')
+                
+                if not isinstance(content, str) or not content.strip():
+                    return {
+                        'statusCode': 400,
+                        'headers': headers,
+                        'body': json.dumps({'success': False, 'error': 'Сообщение не может быть пустым'}),
+                        'isBase64Encoded': False
+                    }
+                
+                cur.execute('SELECT chat_id FROM messages WHERE id = %s AND sender_id = %s AND deleted_at IS NULL',
+                            (message_id, sender_id))
+                message = cur.fetchone()
+                
+                if message:
+                    cur.execute('''
+                        UPDATE messages
+                        SET content = %s, edited_at = CURRENT_TIMESTAMP, version = %s
+                        WHERE id = %s AND deleted_at IS NULL
+                        RETURNING id, chat_id, content, edited_at, version
+                    ''', (content, next_message_version(cur, message[0]), message_id))
+                    message = cur.fetchone()
+                
+                if not message:
+                    conn.rollback()
+                    return {
+                        'statusCode': 404,
+                        'headers': headers,
+                        'body': json.dumps({'success': False, 'error': 'Сообщение не найдено'}),
+                        'isBase64Encoded': False
+                    }
+                
+                conn.commit()
+                lsn = get_current_lsn(cur)
+                
+                return {
+                    'statusCode': 200,
+                    'headers': headers,
+                    'body': json.dumps({
+                        'success': True,
+                        'message': {
+                            'id': message[0],
+                            'chat_id': message[1],
+                            'content': message[2],
+                            'edited_at': message[3].isoformat(),
+                            'version': message[4]
+                        },
+                        'lsn': lsn
+                    }),
+                    'isBase64Encoded': False
+                }
+            
+            elif action == 'delete_message':
+                message_id = body_data.get('message_id')
+                sender_id = body_data.get('sender_id')
+                
+                cur.execute('SELECT chat_id FROM messages WHERE id = %s AND sender_id = %s AND deleted_at IS NULL',
+                            (message_id, sender_id))
+                message = cur.fetchone()
+                
+                if message:
+                    # The row stays as a tombstone so delta sync can tell clients about the delete
+                    cur.execute('''
+                        UPDATE messages
+                        SET content = NULL, file_url = NULL, file_name = NULL,
+                            deleted_at = CURRENT_TIMESTAMP, version = %s
+                        WHERE id = %s AND deleted_at IS NULL
+                        RETURNING id, chat_id, version
+                    ''', (next_message_version(cur, message[0]), message_id))
+                    message = cur.fetchone()
+                
+                if not message:
+                    conn.rollback()
+                    return {
+                        'statusCode': 404,
+                        'headers': headers,
+                        'body': json.dumps({'success': False, 'error': 'Сообщение не найдено'}),
+                        'isBase64Encoded': False
+                    }
+                
+                conn.commit()
+                lsn = get_current_lsn(cur)
+                
+                return {
+                    'statusCode': 200,
+                    'headers': headers,
+                    'body': json.dumps({
+                        'success': True,
+                        'message': {
+                            'id': message[0],
+                            'chat_id': message[1],
+                            'version': message[2],
+                            'is_deleted': True
+                        },
+                        'lsn': lsn
+                    }),
+                    'isBase64Encoded': False
+                }
+            
+            elif action == 'set_retention':
+                chat_id = body_data.get('chat_id')
+                user_id = body_data.get('user_id')
+                retention_days = body_data.get('retention_days')
+                
+                try:
+                    retention_days = int(retention_days) if retention_days is not None else None
+                    valid_retention = retention_days is None or retention_days > 0
+                except (TypeError, ValueError):
+                    valid_retention = False
+                
+                if not valid_retention:
+                    return {
+                        'statusCode': 400,
+                        'headers': headers,
+                        'body': json.dumps({'success': False, 'error': 'Срок хранения должен быть больше нуля'}),
+                        'isBase64Encoded': False
+                    }
+                
+                cur.execute('''
+                    UPDATE chats SET retention_days = %s
+                    WHERE id = %s AND (user1_id = %s OR user2_id = %s)
+                    RETURNING id, retention_days
+                ''', (retention_days, chat_id, user_id, user_id))
+                
+                chat = cur.fetchone()
+                
+                if not chat:
+                    return {
+                        'statusCode': 404,
+                        'headers': headers,
+                        'body': json.dumps({'success': False, 'error': 'Чат не найден'}),
+                        'isBase64Encoded': False
+                    }
+                
+                conn.commit()
+                lsn = get_current_lsn(cur)
+                
+                return {
+                    'statusCode': 200,
+                    'headers': headers,
+                    'body': json.dumps({
+                        'success': True,
+                        'chat_id': chat[0],
+                        'retention_days': chat[1],
+                        'lsn': lsn
+                    }),
+                    'isBase64Encoded': False
+                }
         
         elif method == 'GET':
             params = event.get('queryStringParameters', {})
@@ -176,14 +554,46 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             if action == 'get_messages':
                 chat_id = params.get('chat_id')
                 
-                cur.execute('''
-                    SELECT m.id, m.chat_id, m.sender_id, m.content, m.message_type, 
-                           m.file_url, m.file_name, m.created_at, u.display_name, u.avatar_url
-                    FROM messages m
-                    JOIN users u ON m.sender_id = u.id
-                    WHERE m.chat_id = %s
-                    ORDER BY m.created_at ASC
-                ''', (chat_id,))
+                try:
+                    since_version = int(params['since_version']) if params.get('since_version') else None
+                except ValueError:
+                    return {
+                        'statusCode': 400,
+                        'headers': headers,
+                        'body': json.dumps({'success': False, 'error': 'Неверная версия синхронизации'}),
+                        'isBase64Encoded': False
+                    }
+                
+                # One snapshot for the counters and the rows, so sync_version covers exactly what is returned
+                conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+                
+                cur.execute('SELECT msg_version, purged_version FROM chats WHERE id = %s', (chat_id,))
+                sync_version, purged_version = cur.fetchone() or (0, 0)
+                
+                # Tombstones the client has not seen were purged, a delta would silently miss those deletes
+                resync_required = since_version is not None and since_version < purged_version
+                
+                if since_version is not None and not resync_required:
+                    # Delta sync: everything changed since the client's version, tombstones included
+                    cur.execute('''
+                        SELECT m.id, m.chat_id, m.sender_id, m.content, m.message_type,
+                               m.file_url, m.file_name, m.created_at, u.display_name, u.avatar_url,
+                               m.version, m.edited_at, m.deleted_at
+                        FROM messages m
+                        JOIN users u ON m.sender_id = u.id
+                        WHERE m.chat_id = %s AND m.version > %s
+                        ORDER BY m.version ASC
+                    ''', (chat_id, since_version))
+                else:
+                    cur.execute('''
+                        SELECT m.id, m.chat_id, m.sender_id, m.content, m.message_type,
+                               m.file_url, m.file_name, m.created_at, u.display_name, u.avatar_url,
+                               m.version, m.edited_at, m.deleted_at
+                        FROM messages m
+                        JOIN users u ON m.sender_id = u.id
+                        WHERE m.chat_id = %s AND m.deleted_at IS NULL
+                        ORDER BY m.created_at ASC
+                    ''', (chat_id,))
                 
                 messages = cur.fetchall()
                 
@@ -202,44 +612,64 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                             'file_name': msg[6],
                             'created_at': msg[7].isoformat(),
                             'sender_name': msg[8],
-                            'sender_avatar': msg[9]
-                        } for msg in messages]
+                            'sender_avatar': msg[9],
+                            'version': msg[10],
+                            'edited_at': msg[11].isoformat() if msg[11] else None,
+                            'is_deleted': msg[12] is not None
+                        } for msg in messages],
+                        'sync_version': sync_version,
+                        'resync_required': resync_required
                     }),
                     'isBase64Encoded': False
                 }
             
             elif action == 'get_contacts':
-                user_id = params.get('user_id')
+                sort = params.get('sort', 'recent')
+                verified = params.get('verified') == 'true'
+                online = params.get('online') == 'true'
+                prefix = params.get('prefix', '').strip().lower()
                 
-                cur.execute('''
-                    SELECT c.id, c.contact_user_id, c.custom_name, 
-                           u.username, u.display_name, u.avatar_url, 
-                           u.is_verified, u.is_friend_of_admin, u.last_seen, u.status_visibility
-                    FROM contacts c
-                    JOIN users u ON c.contact_user_id = u.id
-                    WHERE c.user_id = %s
-                    ORDER BY c.added_at DESC
-                ''', (user_id,))
+                try:
+                    user_id = int(params.get('user_id', 0))
+                    limit = min(int(params.get('limit', CONTACTS_PAGE_SIZE)), CONTACTS_MAX_PAGE_SIZE)
+                    cursor = decode_cursor(params['cursor'], sort) if params.get('cursor') else None
+                    valid_params = sort in CONTACT_SORTS and limit > 0
+                except ValueError:
+                    valid_params = False
+                
+                if not valid_params:
+                    return {
+                        'statusCode': 400,
+                        'headers': headers,
+                        'body': json.dumps({'success': False, 'error': 'Неверные параметры списка'}),
+                        'isBase64Encoded': False
+                    }
                 
-                contacts = cur.fetchall()
+                # Only the default first page is cached, every other page is a keyset query
+                if cursor or verified or online or prefix or limit != CONTACTS_PAGE_SIZE:
+                    page = query_contacts_page(cur, user_id, sort, cursor, limit, verified, online, prefix)
+                else:
+                    cur.execute('SELECT version, pages -> %s FROM contact_snapshots WHERE user_id = %s', (sort, user_id))
+                    snapshot = cur.fetchone()
+                    
+                    if snapshot and snapshot[1] is not None:
+                        page = snapshot[1]
+                        page['contacts'] = with_live_presence(cur, page['contacts'])
+                    else:
+                        page = query_contacts_page(cur, user_id, sort, None, limit, False, False, '')
+                        store_contacts_page(user_id, snapshot[0] if snapshot else 0, sort, {
+                            'contacts': [{field: value for field, value in cont.items() if field not in CONTACT_PRESENCE_FIELDS}
+                                         for cont in page['contacts']],
+                            'next_cursor': page['next_cursor']
+                        })
                 
                 return {
                     'statusCode': 200,
                     'headers': headers,
                     'body': json.dumps({
                         'success': True,
-                        'contacts': [{
-                            'id': cont[0],
-                            'user_id': cont[1],
-                            'custom_name': cont[2],
-                            'username': cont[3],
-                            'display_name': cont[4],
-                            'avatar_url': cont[5],
-                            'is_verified': cont[6],
-                            'is_friend_of_admin': cont[7],
-                            'last_seen': cont[8].isoformat() if cont[8] else None,
-                            'status_visibility': cont[9]
-                        } for cont in contacts]
+                        'contacts': page['contacts'],
+                        'next_cursor': page['next_cursor']
                     }),
                     'isBase64Encoded': False
                 }
@@ -251,8 +681,8 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     SELECT DISTINCT c.id, 
                            CASE WHEN c.user1_id = %s THEN c.user2_id ELSE c.user1_id END as other_user_id,
                            u.username, u.display_name, u.avatar_url,
-                           (SELECT content FROM messages WHERE chat_id = c.id ORDER BY created_at DESC LIMIT 1) as last_message,
-                           (SELECT created_at FROM messages WHERE chat_id = c.id ORDER BY created_at DESC LIMIT 1) as last_message_time
+                           (SELECT content FROM messages WHERE chat_id = c.id AND deleted_at IS NULL ORDER BY created_at DESC LIMIT 1) as last_message,
+                           (SELECT created_at FROM messages WHERE chat_id = c.id AND deleted_at IS NULL ORDER BY created_at DESC LIMIT 1) as last_message_time
                     FROM chats c
                     JOIN users u ON (CASE WHEN c.user1_id = %s THEN c.user2_id ELSE c.user1_id END) = u.id
                     WHERE c.user1_id = %s OR c.user2_id = %s
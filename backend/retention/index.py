@@ -0,0 +1,186 @@
+'''
+Business: Background cleanup of expired messages, old tombstones and stale typing indicators
+Args: event from the scheduled job with the X-Retention-Secret header, context
+Returns: HTTP response with the number of rows processed per step
+'''
+
+import json
+import os
+import hmac
+import time
+import psycopg2
+from typing import Dict, Any
+
+BATCH_SIZE = int(os.environ.get('RETENTION_BATCH_SIZE', '1000'))
+MAX_RUN_SECONDS = float(os.environ.get('RETENTION_MAX_RUN_SECONDS', '20'))
+TOMBSTONE_TTL_DAYS = int(os.environ.get('TOMBSTONE_TTL_DAYS', '30'))
+TYPING_TTL_SECONDS = 60
+BATCH_PAUSE_SECONDS = 0.05
+
+def get_db_connection():
+    dsn = os.environ.get('DATABASE_URL')
+    return psycopg2.connect(dsn)
+
+def is_authorized(event: Dict[str, Any]) -> bool:
+    secret = os.environ.get('RETENTION_SECRET')
+    request_headers = {key.lower(): value for key, value in (event.get('headers') or {}).items()}
+    provided = request_headers.get('x-retention-secret', '')
+    return bool(secret) and hmac.compare_digest(provided.encode(), secret.encode())
+
+def run_in_batches(conn, query: str, params: tuple, deadline: float) -> int:
+    '''
+    Runs a batch query (LIMIT %s FOR UPDATE SKIP LOCKED, returning the row count)
+    until a batch comes back short, committing after every batch so locks are held briefly
+    and concurrent senders never wait on the cleanup.
+    '''
+    cur = conn.cursor()
+    total = 0
+    
+    while time.monotonic() < deadline:
+        cur.execute(query, params + (BATCH_SIZE,))
+        processed = cur.fetchone()[0]
+        conn.commit()
+        total += processed
+        
+        if processed < BATCH_SIZE:
+            break
+        time.sleep(BATCH_PAUSE_SECONDS)
+    
+    cur.close()
+    return total
+
+def expire_chat_messages(conn, chat_id: int, retention_days: int, deadline: float) -> int:
+    '''
+    Turns expired messages of one chat into tombstones, one batch per transaction.
+    The chat row is locked first, in the same order as send/edit/delete in the
+    messages function, so the job cannot deadlock with a user editing an expiring message.
+    '''
+    cur = conn.cursor()
+    total = 0
+    
+    while time.monotonic() < deadline:
+        cur.execute('UPDATE chats SET msg_version = msg_version + 1 WHERE id = %s RETURNING msg_version', (chat_id,))
+        chat = cur.fetchone()
+        
+        if not chat:
+            conn.rollback()
+            break
+        
+        cur.execute('''
+            UPDATE messages
+            SET content = NULL, file_url = NULL, file_name = NULL,
+                deleted_at = CURRENT_TIMESTAMP, version = %s
+            WHERE id IN (
+                SELECT id FROM messages
+                WHERE chat_id = %s AND deleted_at IS NULL
+                  AND created_at < CURRENT_TIMESTAMP - make_interval(days => %s)
+                ORDER BY id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+        ''', (chat[0], chat_id, retention_days, BATCH_SIZE))
+        expired = cur.rowcount
+        
+        # Nothing expired: keep the version counter untouched
+        if expired == 0:
+            conn.rollback()
+            break
+        
+        conn.commit()
+        total += expired
+        
+        if expired < BATCH_SIZE:
+            break
+        time.sleep(BATCH_PAUSE_SECONDS)
+    
+    cur.close()
+    return total
+
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    headers = {
+        'Content-Type': 'application/json'
+    }
+    
+    if not is_authorized(event):
+        return {
+            'statusCode': 403,
+            'headers': headers,
+            'body': json.dumps({'success': False, 'error': 'Forbidden'}),
+            'isBase64Encoded': False
+        }
+    
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor()
+        deadline = time.monotonic() + MAX_RUN_SECONDS
+        
+        pruned_typing = run_in_batches(conn, '''
+            WITH pruned AS (
+                DELETE FROM typing_indicators WHERE id IN (
+                    SELECT id FROM typing_indicators
+                    WHERE last_typing < CURRENT_TIMESTAMP - make_interval(secs => %s)
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id
+            )
+            SELECT COUNT(*) FROM pruned
+        ''', (TYPING_TTL_SECONDS,), deadline)
+        
+        cur.execute('SELECT id, retention_days FROM chats WHERE retention_days IS NOT NULL')
+        policies = cur.fetchall()
+        conn.commit()
+        
+        # Expired messages become tombstones with a fresh chat version, so delta sync clients
+        # drop them too; the rows themselves go away with the tombstone purge below
+        expired_messages = 0
+        for chat_id, retention_days in policies:
+            if time.monotonic() >= deadline:
+                break
+            expired_messages += expire_chat_messages(conn, chat_id, retention_days, deadline)
+        
+        # Raising purged_version tells get_messages that clients behind it must resync
+        purged_tombstones = run_in_batches(conn, '''
+            WITH purged AS (
+                DELETE FROM messages WHERE id IN (
+                    SELECT id FROM messages
+                    WHERE deleted_at IS NOT NULL
+                      AND deleted_at < CURRENT_TIMESTAMP - make_interval(days => %s)
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING chat_id, version
+            ), watermarks AS (
+                UPDATE chats c
+                SET purged_version = GREATEST(c.purged_version, p.max_version)
+                FROM (SELECT chat_id, MAX(version) AS max_version FROM purged GROUP BY chat_id) p
+                WHERE c.id = p.chat_id
+            )
+            SELECT COUNT(*) FROM purged
+        ''', (TOMBSTONE_TTL_DAYS,), deadline)
+        
+        cur.close()
+        conn.close()
+        
+        return {
+            'statusCode': 200,
+            'headers': headers,
+            'body': json.dumps({
+                'success': True,
+                'processed': {
+                    'typing_indicators': pruned_typing,
+                    'expired_messages': expired_messages,
+                    'tombstones': purged_tombstones
+                },
+                'finished': time.monotonic() < deadline
+            }),
+            'isBase64Encoded': False
+        }
+    
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'headers': headers,
+            'body': json.dumps({'success': False, 'error': str(e)}),
+            'isBase64Encoded': False
+        }
@@ -6,13 +6,80 @@ Returns: HTTP response with user search results or contact add confirmation
 
 import json
 import os
+import re
+import time
+import random
 import psycopg2
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+
+REPLICA_WAIT_SECONDS = float(os.environ.get('REPLICA_WAIT_SECONDS', '0.5'))
+REPLICA_POLL_SECONDS = 0.05
+REPLICA_CONNECT_TIMEOUT = 2
+REPLICA_COOLDOWN_SECONDS = 30
+LSN_PATTERN = re.compile(r'^[0-9A-Fa-f]{1,8}/[0-9A-Fa-f]{1,8}$')
+
+# Replicas that failed to connect are skipped until this time, kept across warm invocations
+replica_down_until: Dict[str, float] = {}
 
 def get_db_connection():
     dsn = os.environ.get('DATABASE_URL')
     return psycopg2.connect(dsn)
 
+def get_replica_dsns() -> List[str]:
+    raw = os.environ.get('DATABASE_REPLICA_URLS', '')
+    return [dsn.strip() for dsn in raw.split(',') if dsn.strip()]
+
+def replica_caught_up(conn, min_lsn: str, deadline: float) -> bool:
+    cur = conn.cursor()
+    while True:
+        cur.execute('SELECT COALESCE(pg_last_wal_replay_lsn() >= %s::pg_lsn, TRUE)', (min_lsn,))
+        caught_up = cur.fetchone()[0]
+        if caught_up or time.monotonic() >= deadline:
+            break
+        time.sleep(REPLICA_POLL_SECONDS)
+    cur.close()
+    conn.rollback()
+    return caught_up
+
+def get_read_connection(min_lsn: Optional[str] = None):
+    '''
+    Read-only actions go to a random replica from DATABASE_REPLICA_URLS.
+    If the client sent the LSN of its last write, the replica must have replayed it
+    within REPLICA_WAIT_SECONDS, otherwise the read falls back to the primary.
+    '''
+    if min_lsn and not LSN_PATTERN.match(min_lsn):
+        min_lsn = None
+    
+    replica_dsns = get_replica_dsns()
+    random.shuffle(replica_dsns)
+    deadline = time.monotonic() + REPLICA_WAIT_SECONDS
+    
+    for dsn in replica_dsns:
+        if replica_down_until.get(dsn, 0) > time.monotonic():
+            continue
+        try:
+            conn = psycopg2.connect(dsn, connect_timeout=REPLICA_CONNECT_TIMEOUT)
+        except psycopg2.Error:
+            replica_down_until[dsn] = time.monotonic() + REPLICA_COOLDOWN_SECONDS
+            continue
+        if not min_lsn or replica_caught_up(conn, min_lsn, deadline):
+            return conn
+        conn.close()
+    
+    return get_db_connection()
+
+def get_current_lsn(cur) -> str:
+    cur.execute('SELECT pg_current_wal_lsn()::text')
+    return cur.fetchone()[0]
+
+def invalidate_contacts_snapshot(cur, user_id: int) -> None:
+    cur.execute('''
+        INSERT INTO t_p69961614_web_messenger_projec.contact_snapshots (user_id, version, pages)
+        VALUES (%s, 1, NULL)
+        ON CONFLICT (user_id) DO UPDATE
+        SET version = contact_snapshots.version + 1, pages = NULL, built_at = NULL
+    ''', (user_id,))
+
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     method: str = event.get('httpMethod', 'GET')
     
@@ -34,7 +101,11 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         'Access-Control-Allow-Origin': '*'
     }
     
-    conn = get_db_connection()
+    if method == 'GET':
+        min_lsn = (event.get('queryStringParameters') or {}).get('min_lsn')
+        conn = get_read_connection(min_lsn)
+    else:
+        conn = get_db_connection()
     cur = conn.cursor()
     
     if method == 'GET':
@@ -107,7 +178,10 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         ''', (current_user_id, target_user_id))
         
         result = cur.fetchone()
+        if result:
+            invalidate_contacts_snapshot(cur, current_user_id)
         conn.commit()
+        lsn = get_current_lsn(cur)
         
         cur.close()
         conn.close()
@@ -117,7 +191,8 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'headers': headers,
             'body': json.dumps({
                 'success': True,
-                'message': 'Contact added successfully' if result else 'Contact already exists'
+                'message': 'Contact added successfully' if result else 'Contact already exists',
+                'lsn': lsn
             }),
             'isBase64Encoded': False
         }
@@ -0,0 +1,30 @@
+-- Message versions drive delta sync. Each chat hands out versions from its own counter
+-- under the chat row lock, so versions within a chat become visible in commit order.
+-- msg_version: last version handed out, purged_version: highest version whose tombstone was purged
+ALTER TABLE t_p69961614_web_messenger_projec.chats
+ADD COLUMN msg_version BIGINT NOT NULL DEFAULT 0,
+ADD COLUMN purged_version BIGINT NOT NULL DEFAULT 0;
+
+-- Nullable columns without a default are a catalog-only change, the messages table is not rewritten.
+-- version is backfilled and made NOT NULL in the next migration, so its exclusive lock is not held through the backfill
+ALTER TABLE t_p69961614_web_messenger_projec.messages
+ADD COLUMN version BIGINT,
+ADD COLUMN edited_at TIMESTAMP,
+ADD COLUMN deleted_at TIMESTAMP;
+
+-- Partial index for the background job purging old tombstones
+CREATE INDEX idx_messages_deleted_at ON t_p69961614_web_messenger_projec.messages(deleted_at)
+WHERE deleted_at IS NOT NULL;
+
+-- Per-chat retention policy, NULL keeps messages forever
+ALTER TABLE t_p69961614_web_messenger_projec.chats
+ADD COLUMN retention_days INTEGER CHECK (retention_days > 0);
+
+-- Index for pruning stale typing indicators
+CREATE INDEX idx_typing_indicators_last_typing ON t_p69961614_web_messenger_projec.typing_indicators(last_typing);
+
+-- Serves both the retention job and the last-message lookups in get_chats,
+-- and covers every lookup the single-column chat_id index was used for
+CREATE INDEX idx_messages_chat_created_at ON t_p69961614_web_messenger_projec.messages(chat_id, created_at);
+
+DROP INDEX IF EXISTS t_p69961614_web_messenger_projec.idx_messages_chat_id;
@@ -0,0 +1,32 @@
+-- Backfill message versions; message ids already grow within every chat.
+-- The loop keeps each UPDATE statement bounded, but it runs inside this migration's transaction:
+-- updated rows stay locked until it commits. No table rewrite and no exclusive lock are needed for it
+DO $$
+DECLARE
+    batch_start INTEGER := 0;
+    last_id INTEGER;
+BEGIN
+    SELECT COALESCE(MAX(id), 0) INTO last_id FROM t_p69961614_web_messenger_projec.messages;
+    WHILE batch_start < last_id LOOP
+        UPDATE t_p69961614_web_messenger_projec.messages
+        SET version = id
+        WHERE id > batch_start AND id <= batch_start + 10000 AND version IS NULL;
+        batch_start := batch_start + 10000;
+    END LOOP;
+END $$;
+
+UPDATE t_p69961614_web_messenger_projec.chats c
+SET msg_version = m.max_version
+FROM (
+    SELECT chat_id, MAX(version) AS max_version
+    FROM t_p69961614_web_messenger_projec.messages
+    GROUP BY chat_id
+) m
+WHERE c.id = m.chat_id;
+
+CREATE INDEX idx_messages_chat_version ON t_p69961614_web_messenger_projec.messages(chat_id, version);
+
+-- Scans messages under an exclusive lock to check for NULLs, but does not rewrite the table.
+-- No default: every writer passes the version from the chat counter
+ALTER TABLE t_p69961614_web_messenger_projec.messages
+ALTER COLUMN version SET NOT NULL;
@@ -0,0 +1,15 @@
+-- Cached first page of the contacts list per sort order, e.g. {"recent": {...}, "name": {...}}.
+-- Only profile fields are cached, presence is read live. Invalidation bumps version and clears pages,
+-- a page is only stored if the version it was built from is still current
+CREATE TABLE IF NOT EXISTS t_p69961614_web_messenger_projec.contact_snapshots (
+    user_id INTEGER PRIMARY KEY REFERENCES t_p69961614_web_messenger_projec.users(id),
+    version INTEGER NOT NULL DEFAULT 0,
+    pages JSONB,
+    built_at TIMESTAMP
+);
+
+-- Keyset order of the contacts list; filters are evaluated on the user's contact rows it returns
+CREATE INDEX idx_contacts_user_added ON t_p69961614_web_messenger_projec.contacts(user_id, added_at DESC, id DESC);
+
+-- Reverse lookup to invalidate every snapshot that includes a given user
+CREATE INDEX idx_contacts_contact_user_id ON t_p69961614_web_messenger_projec.contacts(contact_user_id);
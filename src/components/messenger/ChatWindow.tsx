@@ -4,6 +4,7 @@ import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
 import Icon from '@/components/ui/icon';
 import { User } from '@/pages/Index';
+import { rememberLsn, minLsnParam } from '@/lib/lsn';
 
 const MESSAGES_URL = 'https://functions.poehali.dev/01ddfc19-e4e5-4682-a2c0-1360af821890';
 
@@ -26,6 +27,9 @@ interface Message {
   created_at: string;
   sender_name: string;
   sender_avatar?: string;
+  version: number;
+  edited_at?: string;
+  is_deleted: boolean;
 }
 
 interface ChatWindowProps {
@@ -42,12 +46,18 @@ export default function ChatWindow({ user, chat, onBack }: ChatWindowProps) {
   const [sending, setSending] = useState(false);
   const messagesEndRef = useRef<HTMLDivElement>(null);
   const typingTimeoutRef = useRef<NodeJS.Timeout>();
+  const syncVersionRef = useRef(0);
+  const activeChatIdRef = useRef(chatId);
 
   useEffect(() => {
     initChat();
   }, [chat.other_user_id]);
 
   useEffect(() => {
+    activeChatIdRef.current = chatId;
+    syncVersionRef.current = 0;
+    setMessages([]);
+
     if (chatId > 0) {
       fetchMessages();
       const interval = setInterval(() => {
@@ -92,18 +102,45 @@ export default function ChatWindow({ user, chat, onBack }: ChatWindowProps) {
   const fetchMessages = async () => {
     if (chatId <= 0) return;
 
+    const requestChatId = chatId;
+
     try {
-      const response = await fetch(`${MESSAGES_URL}?action=get_messages&chat_id=${chatId}`);
+      const since = syncVersionRef.current > 0 ? `&since_version=${syncVersionRef.current}` : '';
+      const response = await fetch(
+        `${MESSAGES_URL}?action=get_messages&chat_id=${chatId}${since}${minLsnParam()}`
+      );
       const data = await response.json();
 
+      // The user may have switched chats while this request was in flight
+      if (activeChatIdRef.current !== requestChatId) return;
+
       if (data.success && data.messages) {
-        setMessages(data.messages);
+        if (since && !data.resync_required) {
+          setMessages((prev) => mergeMessages(prev, data.messages));
+        } else {
+          setMessages(data.messages);
+        }
+        syncVersionRef.current = data.sync_version;
       }
     } catch (err) {
       console.error('Failed to fetch messages', err);
     }
   };
 
+  const mergeMessages = (current: Message[], changes: Message[]) => {
+    const byId = new Map(current.map((msg) => [msg.id, msg]));
+
+    changes.forEach((msg) => {
+      if (msg.is_deleted) {
+        byId.delete(msg.id);
+      } else {
+        byId.set(msg.id, msg);
+      }
+    });
+
+    return Array.from(byId.values()).sort((a, b) => a.id - b.id);
+  };
+
   const checkTyping = async () => {
     if (chatId <= 0) return;
 
@@ -160,6 +197,7 @@ export default function ChatWindow({ user, chat, onBack }: ChatWindowProps) {
       const data = await response.json();
 
       if (data.success) {
+        rememberLsn(data.lsn);
         setNewMessage('');
         await fetchMessages();
       }
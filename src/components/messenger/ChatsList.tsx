@@ -1,6 +1,7 @@
 import { useState, useEffect } from 'react';
 import { Avatar, AvatarFallback } from '@/components/ui/avatar';
 import { User } from '@/pages/Index';
+import { minLsnParam } from '@/lib/lsn';
 
 const MESSAGES_URL = 'https://functions.poehali.dev/01ddfc19-e4e5-4682-a2c0-1360af821890';
 
@@ -32,7 +33,7 @@ export default function ChatsList({ user, onSelectChat, selectedChatId }: ChatsL
 
   const fetchChats = async () => {
     try {
-      const response = await fetch(`${MESSAGES_URL}?action=get_chats&user_id=${user.id}`);
+      const response = await fetch(`${MESSAGES_URL}?action=get_chats&user_id=${user.id}${minLsnParam()}`);
       const data = await response.json();
 
       if (data.success && data.chats) {
@@ -5,6 +5,7 @@ import { Input } from '@/components/ui/input';
 import { Dialog, DialogContent, DialogHeader, DialogTitle, DialogTrigger } from '@/components/ui/dialog';
 import Icon from '@/components/ui/icon';
 import { User } from '@/pages/Index';
+import { rememberLsn, minLsnParam } from '@/lib/lsn';
 import { Tooltip, TooltipContent, TooltipProvider, TooltipTrigger } from '@/components/ui/tooltip';
 
 const MESSAGES_URL = 'https://functions.poehali.dev/01ddfc19-e4e5-4682-a2c0-1360af821890';
@@ -47,6 +48,8 @@ export default function ContactsList({ user, onSelectContact }: ContactsListProp
   const [searchResults, setSearchResults] = useState<SearchResult[]>([]);
   const [searching, setSearching] = useState(false);
   const [addingContact, setAddingContact] = useState(false);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchContacts();
@@ -54,11 +57,12 @@ export default function ContactsList({ user, onSelectContact }: ContactsListProp
 
   const fetchContacts = async () => {
     try {
-      const response = await fetch(`${MESSAGES_URL}?action=get_contacts&user_id=${user.id}`);
+      const response = await fetch(`${MESSAGES_URL}?action=get_contacts&user_id=${user.id}${minLsnParam()}`);
       const data = await response.json();
 
       if (data.success && data.contacts) {
         setContacts(data.contacts);
+        setNextCursor(data.next_cursor);
       }
     } catch (err) {
       console.error('Failed to fetch contacts', err);
@@ -67,6 +71,28 @@ export default function ContactsList({ user, onSelectContact }: ContactsListProp
     }
   };
 
+  const fetchMoreContacts = async () => {
+    if (!nextCursor || loadingMore) return;
+
+    setLoadingMore(true);
+
+    try {
+      const response = await fetch(
+        `${MESSAGES_URL}?action=get_contacts&user_id=${user.id}&cursor=${encodeURIComponent(nextCursor)}${minLsnParam()}`
+      );
+      const data = await response.json();
+
+      if (data.success && data.contacts) {
+        setContacts((prev) => [...prev, ...data.contacts]);
+        setNextCursor(data.next_cursor);
+      }
+    } catch (err) {
+      console.error('Failed to fetch contacts', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleSearchUsers = async () => {
     if (!searchQuery.trim()) {
       setSearchResults([]);
@@ -107,6 +133,7 @@ export default function ContactsList({ user, onSelectContact }: ContactsListProp
       const data = await response.json();
 
       if (data.success) {
+        rememberLsn(data.lsn);
         await fetchContacts();
         setSearchQuery('');
         setSearchResults([]);
@@ -291,6 +318,18 @@ export default function ContactsList({ user, onSelectContact }: ContactsListProp
               </div>
             </div>
           ))}
+          {nextCursor && (
+            <div className="p-4">
+              <Button
+                variant="secondary"
+                onClick={fetchMoreContacts}
+                disabled={loadingMore}
+                className="w-full rounded-xl"
+              >
+                {loadingMore ? 'Загрузка...' : 'Показать ещё'}
+              </Button>
+            </div>
+          )}
         </div>
       )}
     </div>
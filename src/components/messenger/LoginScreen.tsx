@@ -4,6 +4,7 @@ import { Input } from '@/components/ui/input';
 import { Card } from '@/components/ui/card';
 import Icon from '@/components/ui/icon';
 import { User } from '@/pages/Index';
+import { rememberLsn } from '@/lib/lsn';
 
 const AUTH_URL = 'https://functions.poehali.dev/4cddaa2a-d61f-4ff9-ae6e-25841180c5b8';
 
@@ -36,6 +37,7 @@ export default function LoginScreen({ onLogin }: LoginScreenProps) {
       const data = await response.json();
 
       if (data.success && data.user) {
+        rememberLsn(data.lsn);
         onLogin(data.user);
       } else {
         setError(data.error || 'Ошибка авторизации');
@@ -5,6 +5,7 @@ import { Card } from '@/components/ui/card';
 import { Avatar, AvatarFallback } from '@/components/ui/avatar';
 import Icon from '@/components/ui/icon';
 import { User } from '@/pages/Index';
+import { rememberLsn } from '@/lib/lsn';
 
 const AUTH_URL = 'https://functions.poehali.dev/4cddaa2a-d61f-4ff9-ae6e-25841180c5b8';
 
@@ -41,6 +42,7 @@ export default function ProfileSetup({ user, onComplete }: ProfileSetupProps) {
       const data = await response.json();
 
       if (data.success && data.user) {
+        rememberLsn(data.lsn);
         onComplete({ ...user, ...data.user });
       }
     } catch (err) {
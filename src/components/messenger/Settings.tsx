@@ -7,6 +7,7 @@ import { Card } from '@/components/ui/card';
 import { Separator } from '@/components/ui/separator';
 import Icon from '@/components/ui/icon';
 import { User } from '@/pages/Index';
+import { rememberLsn } from '@/lib/lsn';
 import { Dialog, DialogContent, DialogHeader, DialogTitle, DialogTrigger } from '@/components/ui/dialog';
 import { Tooltip, TooltipContent, TooltipProvider, TooltipTrigger } from '@/components/ui/tooltip';
 
@@ -51,6 +52,7 @@ export default function Settings({ user, onLogout }: SettingsProps) {
       const data = await response.json();
 
       if (data.success) {
+        rememberLsn(data.lsn);
         const updatedUser = { ...user, ...data.user };
         localStorage.setItem('currentUser', JSON.stringify(updatedUser));
         setIsEditDialogOpen(false);
@@ -0,0 +1,11 @@
+// LSN of this client's latest write. Reads send it as min_lsn so a replica that has not
+// replayed the write yet is skipped and the client always sees what it just wrote.
+let lastLsn: string | null = null;
+
+export function rememberLsn(lsn?: string | null) {
+  if (lsn) lastLsn = lsn;
+}
+
+export function minLsnParam(): string {
+  return lastLsn ? `&min_lsn=${encodeURIComponent(lastLsn)}` : '';
+}